@@ -0,0 +1,12 @@
+"""
+app/__init__.py
+
+This file indicates that 'app' is a Python package. It also re-exports
+the Pipeline class, so you can import it directly from 'app'.
+"""
+
+from .pipeline import Pipeline
+
+__all__ = [
+    "Pipeline",
+]
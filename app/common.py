@@ -0,0 +1,196 @@
+"""
+app/common.py
+
+Helpers shared by the camera loops in app/pipeline.py and script/main.py:
+camera and pose setup, the capture thread, pose inference on camera frames,
+bounded "newest wins" queues, thread pinning and non-blocking logging setup.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def put_latest(q, item):
+    """Put item on a bounded queue, dropping the oldest entry if it is full."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def pin_current_thread(core):
+    """
+    Pin the calling thread to one CPU core, so a pipeline stage stays on a warm
+    cache instead of migrating. Does nothing if core is None, where thread
+    affinity is not supported (only Linux has os.sched_setaffinity), or where
+    the core is not available.
+
+    Threads started by a pinned thread inherit its single-core mask, OpenCV's
+    worker pool included, so call start_cv_threads() before pinning anything.
+    """
+    if core is not None and hasattr(os, "sched_setaffinity") and core in os.sched_getaffinity(0):
+        os.sched_setaffinity(0, {core})
+
+
+class CaptureThread(threading.Thread):
+    """
+    Read frames from the camera on a background thread so the next frame is
+    being acquired while the consumer runs pose inference on the current one.
+
+    Only the newest frames are kept on frame_q; a None is put on it when the
+    camera stops delivering frames or the thread fails.
+    """
+
+    def __init__(self, cap, frame_q, core=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.frame_q = frame_q
+        self.core = core  # CPU core to pin the thread to, if any
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Ask the thread to stop after the frame it is reading."""
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            pin_current_thread(self.core)
+            while not self._stop_event.is_set():
+                # One grab() + retrieve() is the same as read(): every frame gets
+                # decoded. Latency stays bounded because the driver holds one frame
+                # (open_camera) and put_latest replaces a frame still waiting on frame_q.
+                if not self.cap.grab():
+                    logger.warning("Failed to grab frame")
+                    break
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    logger.warning("Failed to grab frame")
+                    break
+                put_latest(self.frame_q, frame)
+        finally:
+            # Sent even if the loop raised, so the consumer never waits forever
+            put_latest(self.frame_q, None)
+
+
+def start_cv_threads():
+    """
+    Start OpenCV's worker thread pool from the calling thread, which should be
+    the unpinned main thread. OpenCV creates the pool on its first parallel
+    call; if that call came from a pinned thread, every worker would inherit
+    the one-core mask and cvtColor and friends would run on a single core.
+    """
+    cv2.cvtColor(np.zeros((480, 640, 3), dtype=np.uint8), cv2.COLOR_BGR2RGB)
+
+
+def create_pose():
+    """
+    Create the MediaPipe Pose estimator used by the camera loops, warmed up
+    and ready for the first camera frame.
+    """
+    pose = mp.solutions.pose.Pose(
+        # Lite model: wrists, shoulders, hips and nose are all it needs to track.
+        model_complexity=0,
+        min_detection_confidence=0.5,
+        # Drop low-confidence tracks from the Lite model and re-detect instead.
+        min_tracking_confidence=0.7,
+        smooth_landmarks=True
+    )
+    # Warm up the graph on a blank frame so model loading and first-run
+    # allocations happen now, not on the first camera frame.
+    pose.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    return pose
+
+
+class PoseRunner:
+    """
+    Run pose inference on BGR camera frames for one loop.
+
+    Keeps the state that loop needs between frames: the hash of the last frame
+    checked, to spot duplicates, and an RGB buffer that is reused for every
+    conversion. Use one instance per thread.
+    """
+
+    def __init__(self, pose):
+        self.pose = pose
+        self._last_hash = None
+        self._rgb_frame = None
+
+    def is_duplicate(self, frame):
+        """
+        True if frame is identical to the one passed last time. Some camera
+        backends hand over the same buffer twice; a hash of every 16th pixel
+        spots that in a few microseconds, so inference can be skipped.
+        """
+        frame_hash = hash(frame[::16, ::16].tobytes())
+        duplicate = frame_hash == self._last_hash
+        self._last_hash = frame_hash
+        return duplicate
+
+    def process(self, frame):
+        """Run pose on a BGR frame and return its pose_landmarks (None if no pose)."""
+        # pose.process is done with the RGB copy when it returns, so one buffer is reused.
+        rgb_frame = self._rgb_frame
+        if rgb_frame is None or rgb_frame.shape != frame.shape:
+            rgb_frame = self._rgb_frame = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+        rgb_frame.flags.writeable = False
+        results = self.pose.process(rgb_frame)
+        rgb_frame.flags.writeable = True
+        return results.pose_landmarks
+
+
+def open_camera(index=0, width=640, height=480):
+    """
+    Open a camera and configure it for low-latency capture.
+
+    Args:
+        index (int): Camera index passed to cv2.VideoCapture.
+        width, height (int): Requested resolution; lower is faster.
+
+    Returns:
+        The opened cv2.VideoCapture.
+    """
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        raise Exception("Could not open camera")
+    # Keep only one frame in the driver queue, so each read returns a fresh frame
+    # instead of one that waited behind several older ones.
+    if not cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+        logger.warning("Could not set the camera buffer size; frames may lag behind")
+    # Ask for MJPG, which the camera compresses and OpenCV decodes cheaply.
+    # Drivers that don't support it keep their default format.
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return cap
+
+
+def start_logging():
+    """
+    Send log records through a queue to a background listener thread, so
+    logging from the frame loops never blocks on writing to the console.
+
+    Returns:
+        The running logging.handlers.QueueListener; stop() it on exit.
+    """
+    log_q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_q, logging.StreamHandler())
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_q))
+    root.setLevel(logging.INFO)
+    listener.start()
+    return listener
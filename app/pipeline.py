@@ -0,0 +1,191 @@
+"""
+app/pipeline.py
+
+Threaded version of the camera loop: capture, pose inference, and game logic
+plus HUD drawing each run on their own thread, connected by small bounded
+queues. Camera I/O, inference and drawing overlap instead of running back to
+back on one core.
+
+Run from the repository root with:
+    python -m app.pipeline
+"""
+
+import logging
+import queue
+import threading
+
+import cv2
+
+from detectors import GameManager
+from exercises.attack_exercise import AttackExercise
+
+from .common import (
+    CaptureThread,
+    PoseRunner,
+    create_pose,
+    open_camera,
+    pin_current_thread,
+    put_latest,
+    start_cv_threads,
+    start_logging,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Pipeline:
+    """
+    Run capture -> pose inference -> game logic/HUD on three daemon threads.
+
+    Rendered frames are read from frames() on the calling thread, which should
+    be the one that owns the window (cv2.imshow is not thread-safe on every platform).
+    Each stage hands over only its newest output; stale frames are dropped
+    rather than queued, so latency stays bounded when inference is slow.
+    """
+
+    def __init__(self, cap, pose, exercise, game, target, maxsize=2, cores=None):
+        """
+        Args:
+            cap (cv2.VideoCapture): An opened camera.
+            pose (mediapipe.solutions.pose.Pose): The pose estimator.
+            exercise (AttackExercise): Turns landmarks into attack motions.
+            game (GameManager): Holds HP values and draws the HP bars.
+            target (str): The player who loses HP for each completed motion.
+            maxsize (int): Capacity of each queue between stages.
+            cores (tuple): Optional (capture, inference, render) CPU cores to pin
+                the stages to; None for any entry, or for cores, leaves that
+                stage to the scheduler. Off by default: pinning only pays off on
+                an otherwise idle machine with a core to spare per stage.
+        """
+        self.cap = cap
+        self.pose = pose
+        self.exercise = exercise
+        self.game = game
+        self.target = target
+        self._cores = cores or (None, None, None)
+
+        self._frame_q = queue.Queue(maxsize=maxsize)   # capture -> inference
+        self._pose_q = queue.Queue(maxsize=maxsize)    # inference -> render
+        self._out_q = queue.Queue(maxsize=maxsize)     # render -> caller
+        self._capture_thread = CaptureThread(cap, self._frame_q, core=self._cores[0])
+        self._threads = [
+            self._capture_thread,
+            threading.Thread(target=self._infer, name="inference", daemon=True),
+            threading.Thread(target=self._render, name="render", daemon=True),
+        ]
+
+    def start(self):
+        """Start all pipeline threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Ask the pipeline to stop and wait briefly for the threads to exit.
+
+        Returns:
+            True if every thread has exited. False means a thread is still
+            running (e.g. capture is stuck in cap.grab()), so the camera must
+            not be released yet.
+        """
+        self._capture_thread.stop()
+        for thread in self._threads:
+            thread.join(timeout)
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def frames(self, timeout=0.1):
+        """
+        Yield rendered BGR frames until the camera stops, a stage fails, or stop()
+        is called.
+
+        Yields None when no frame arrives within timeout seconds, so the caller
+        can keep pumping its window (and notice 'q') while the pipeline is stalled.
+        """
+        render_thread = self._threads[-1]
+        while True:
+            try:
+                frame = self._out_q.get(timeout=timeout)
+            except queue.Empty:
+                # The render stage always sends None on exit, but don't rely on it alone
+                if not render_thread.is_alive() and self._out_q.empty():
+                    return
+                yield None
+                continue
+            if frame is None:
+                return
+            yield frame
+
+    # Each stage (CaptureThread included) sends None downstream from a finally
+    # block, so an exception in any stage still ends the ones after it and, in
+    # the end, frames().
+
+    def _infer(self):
+        try:
+            pin_current_thread(self._cores[1])
+            pose_runner = PoseRunner(self.pose)
+            while True:
+                frame = self._frame_q.get()
+                if frame is None:
+                    break
+                # A duplicate frame is dropped before inference
+                if pose_runner.is_duplicate(frame):
+                    continue
+                put_latest(self._pose_q, (frame, pose_runner.process(frame)))
+        finally:
+            put_latest(self._pose_q, None)
+
+    def _render(self):
+        try:
+            pin_current_thread(self._cores[2])
+            while True:
+                item = self._pose_q.get()
+                if item is None:
+                    break
+                frame, landmarks = item
+
+                if landmarks is not None:
+                    message = self.exercise.process_landmarks(landmarks, frame.shape[1], frame.shape[0])
+                    if message is not None:
+                        self.game.reduce_hp(self.target, self.exercise.hp_per_motion)
+                        if self.exercise.is_cycle_complete():
+                            self.exercise.reset()
+
+                self.game.display_hp_bars(frame)
+                put_latest(self._out_q, frame)
+        finally:
+            put_latest(self._out_q, None)
+
+
+def main():
+    log_listener = start_logging()
+
+    pose = create_pose()
+    start_cv_threads()
+
+    game = GameManager()
+    game.add_player("Player")
+    game.add_player("Enemy")
+
+    cap = open_camera()
+
+    pipeline = Pipeline(cap, pose, AttackExercise(), game, target="Enemy")
+    pipeline.start()
+    try:
+        for frame in pipeline.frames():
+            if frame is not None:
+                cv2.imshow("Attack Exercise", frame)
+            # Press 'q' to quit
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        if pipeline.stop():
+            cap.release()
+        else:
+            logger.warning("Capture thread did not stop; leaving the camera open")
+        cv2.destroyAllWindows()
+        pose.close()
+        log_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
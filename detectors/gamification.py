@@ -1,125 +1,287 @@
-# import cv2
-
-# class GameManager:
-#     """
-#     A class to manage player names, HP values, and display HP bars on a video feed.
-#     This example handles up to two players, each with a bar that changes color
-#     from green to red as HP decreases.
-#     """
-
-#     def __init__(self, max_hp=1000):
-#         """
-#         Args:
-#             max_hp (int): The maximum HP each player can have.
-#         """
-#         self.players = {}     # Dictionary to store {player_name: current_hp}
-#         self.max_hp = max_hp  # Maximum HP for any player
-
-#         # Bar display settings
-#         self.bar_width = 250
-#         self.bar_height = 25
-
-#     def add_player(self, player_name, initial_hp=None):
-#         """
-#         Add a new player to the game.
-
-#         Args:
-#             player_name (str): Unique identifier for the player.
-#             initial_hp (int, optional): Starting HP. Defaults to self.max_hp.
-#         """
-#         if initial_hp is None:
-#             initial_hp = self.max_hp
-#         self.players[player_name] = initial_hp
-
-#     def reduce_hp(self, player_name, amount):
-#         """
-#         Reduce HP of a specific player by a certain amount.
-
-#         Args:
-#             player_name (str): The player's name.
-#             amount (int): The amount of HP to subtract.
-#         """
-#         if player_name in self.players:
-#             new_hp = self.players[player_name] - amount
-#             self.players[player_name] = max(0, min(new_hp, self.max_hp))
-
-#     def set_hp(self, player_name, hp):
-#         """
-#         Directly set the HP of a specific player, clamped between 0 and max_hp.
-
-#         Args:
-#             player_name (str): The player's name.
-#             hp (int): The new HP value.
-#         """
-#         if player_name in self.players:
-#             self.players[player_name] = max(0, min(hp, self.max_hp))
-
-#     def _get_bar_color(self, hp_percentage):
-#         """
-#         Return a color that transitions from green to red as HP goes from 100% to 0%.
-
-#         Args:
-#             hp_percentage (float): The player's HP as a fraction of max HP (0.0 to 1.0).
-
-#         Returns:
-#             (b, g, r) tuple for OpenCV drawing.
-#         """
-#         # Start color: green = (0, 255, 0)
-#         # End color:   red   = (0, 0, 255)
-#         # Simple linear interpolation:
-#         r = int(255 * (1 - hp_percentage))   # goes from 0   to 255
-#         g = int(255 * hp_percentage)         # goes from 255 to 0
-#         b = 0
-#         return (b, g, r)
-
-#     def display_hp_bars(self, image):
-#         """
-#         Draw HP bars for up to two players on the provided image.
-
-#         Args:
-#             image (numpy.ndarray): The frame (BGR) on which HP bars will be drawn.
-#         """
-#         # Only display bars for the first two players
-#         sorted_players = list(self.players.items())[:2]
-
-#         for i, (player_name, hp) in enumerate(sorted_players):
-#             hp_percentage = hp / self.max_hp
-
-#             # Decide bar position: left for player 0, right for player 1
-#             bar_x_offset = 10 if i == 0 else image.shape[1] - self.bar_width - 10
-#             bar_y_offset = 30
-
-#             # Draw a background rectangle (dark gray)
-#             cv2.rectangle(
-#                 image,
-#                 (bar_x_offset, bar_y_offset),
-#                 (bar_x_offset + self.bar_width, bar_y_offset + self.bar_height),
-#                 (50, 50, 50),
-#                 -1
-#             )
-
-#             # Calculate width of the filled portion based on HP percentage
-#             current_bar_width = int(hp_percentage * self.bar_width)
-#             bar_color = self._get_bar_color(hp_percentage)
-
-#             # Draw the HP portion of the bar
-#             cv2.rectangle(
-#                 image,
-#                 (bar_x_offset, bar_y_offset),
-#                 (bar_x_offset + current_bar_width, bar_y_offset + self.bar_height),
-#                 bar_color,
-#                 -1
-#             )
-
-#             # Prepare text (with outline for a more "animated" look)
-#             text = f"{player_name}: {hp} HP"
-#             text_x = bar_x_offset
-#             text_y = bar_y_offset - 5
-#             font_scale = 0.6
-#             thickness = 2
-#             font = cv2.FONT_HERSHEY_SIMPLEX
-
-#             # Draw outline in black (offset thickness)
-#             cv2.putText(image, text, (text_x, text_y), font, font_scale, (0, 0, 0), thickness + 2, cv2.LINE_AA)
-#             # Draw main text in white
-#             cv2.putText(image, text, (text_x, text_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+import threading
+
+import cv2
+import numpy as np
+
+# Capacity of the per-player HP array.
+MAX_PLAYERS = 16
+
+
+def blit(image, patch, mask, x, y):
+    """
+    Copy the masked pixels of patch into image at (x, y), clipped to the image,
+    so a patch that hangs off the edge of a small frame is cut instead of failing.
+
+    Args:
+        image (numpy.ndarray): Destination image, 2-D or (H, W, 3).
+        patch (numpy.ndarray): Source pixels, with the same number of channels.
+        mask (numpy.ndarray): 2-D boolean mask the size of patch; only True pixels are copied.
+        x, y (int): Position of the patch's top-left corner in image.
+    """
+    h, w = patch.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, image.shape[1]), min(y + h, image.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    src = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+    where = mask[src] if patch.ndim == 2 else mask[src][..., None]
+    np.copyto(image[y0:y1, x0:x1], patch[src], where=where)
+
+
+class GameManager:
+    """
+    A class to manage player names, HP values, and display HP bars on a video feed.
+    This example handles up to two players, each with a bar that changes color
+    from green to red as HP decreases.
+
+    HP is stored as whole numbers. Fractional HP values and amounts passed to
+    add_player, reduce_hp, reduce_hp_batch and set_hp are rounded to the nearest
+    integer with round() (halves go to the even neighbor) before being applied.
+    """
+
+    __slots__ = (
+        "_names",
+        "_name_index",
+        "_hp",
+        "max_hp",
+        "_slots",
+        "bar_width",
+        "bar_height",
+        "_color_lut",
+        "_text_cache",
+        "_hud_cache",
+        "_hud_dirty",
+        "_lock",
+    )
+
+    def __init__(self, max_hp=1000):
+        """
+        Args:
+            max_hp (int): The maximum HP each player can have (at most 65535).
+        """
+        if not 0 < max_hp <= np.iinfo(np.uint16).max:
+            raise ValueError(f"max_hp must be between 1 and {np.iinfo(np.uint16).max}, got {max_hp}")
+        self._names = []       # Player names, in the order they were added
+        self._name_index = {}  # {player_name: index into self._hp}
+        self._hp = np.zeros(MAX_PLAYERS, dtype=np.uint16)  # Current HP per player
+        self.max_hp = max_hp   # Maximum HP for any player
+        self._slots = [None, None]  # Names of the (up to) two players shown on the HUD
+
+        # Bar display settings
+        self.bar_width = 250
+        self.bar_height = 25
+
+        # (b, g, r) bar colors for every whole HP percentage, green at 100% to red at 0%.
+        self._color_lut = [
+            (0, int(255 * p / 100), int(255 * (1 - p / 100))) for p in range(101)
+        ]
+
+        # Rendered name/HP labels: {player_name: (hp, (patch, mask, (dx, dy)))}
+        self._text_cache = {}
+        # Composited HUD strip per frame size: {(width, height): (overlay, mask)}.
+        # Rebuilt only after an HP change marks it dirty.
+        self._hud_cache = {}
+        self._hud_dirty = True
+
+        # Guards the HP storage when HP is updated and drawn from different threads.
+        self._lock = threading.Lock()
+
+    @property
+    def players(self):
+        """A {player_name: current_hp} snapshot of every player."""
+        with self._lock:
+            return {name: int(hp) for name, hp in zip(self._names, self._hp)}
+
+    def add_player(self, player_name, initial_hp=None):
+        """
+        Add a new player to the game.
+
+        Args:
+            player_name (str): Unique identifier for the player.
+            initial_hp (int, optional): Starting HP, rounded to a whole number and
+                clamped between 0 and max_hp. Defaults to self.max_hp.
+        """
+        if initial_hp is None:
+            initial_hp = self.max_hp
+        initial_hp = max(0, min(round(initial_hp), self.max_hp))
+        with self._lock:
+            index = self._name_index.get(player_name)
+            if index is None:
+                if len(self._names) == MAX_PLAYERS:
+                    raise ValueError(f"GameManager supports at most {MAX_PLAYERS} players")
+                index = self._name_index[player_name] = len(self._names)
+                self._names.append(player_name)
+                if None in self._slots:
+                    self._slots[self._slots.index(None)] = player_name
+            self._hp[index] = initial_hp
+            self._hud_dirty = True
+
+    def reduce_hp(self, player_name, amount):
+        """
+        Reduce HP of a specific player by a certain amount.
+
+        Args:
+            player_name (str): The player's name.
+            amount (int): The amount of HP to subtract, rounded to a whole number.
+        """
+        with self._lock:
+            try:
+                i = self._name_index[player_name]
+            except KeyError:
+                return
+            new_hp = int(self._hp[i]) - round(amount)
+            max_hp = self.max_hp
+            if new_hp < 0:
+                new_hp = 0
+            elif new_hp > max_hp:
+                new_hp = max_hp
+            self._hp[i] = new_hp
+            self._hud_dirty = True
+
+    def reduce_hp_batch(self, updates):
+        """
+        Reduce HP of several players at once, clamped between 0 and max_hp.
+
+        Args:
+            updates (dict): {player_name: amount}. Amounts are rounded to whole
+                numbers; unknown names are ignored.
+        """
+        with self._lock:
+            n = len(self._names)
+            delta = np.zeros(n, dtype=np.int32)
+            for player_name, amount in updates.items():
+                i = self._name_index.get(player_name)
+                if i is not None:
+                    delta[i] += round(amount)
+            # Subtract in int32 so the uint16 storage cannot wrap below zero.
+            self._hp[:n] = np.clip(self._hp[:n].astype(np.int32) - delta, 0, self.max_hp)
+            self._hud_dirty = True
+
+    def set_hp(self, player_name, hp):
+        """
+        Directly set the HP of a specific player, clamped between 0 and max_hp.
+
+        Args:
+            player_name (str): The player's name.
+            hp (int): The new HP value, rounded to a whole number.
+        """
+        hp = round(hp)
+        with self._lock:
+            try:
+                i = self._name_index[player_name]
+            except KeyError:
+                return
+            max_hp = self.max_hp
+            if hp < 0:
+                hp = 0
+            elif hp > max_hp:
+                hp = max_hp
+            self._hp[i] = hp
+            self._hud_dirty = True
+
+    def _get_bar_color(self, hp_percentage):
+        """
+        Return a color that transitions from green to red as HP goes from 100% to 0%.
+
+        Args:
+            hp_percentage (float): The player's HP as a fraction of max HP (0.0 to 1.0).
+
+        Returns:
+            (b, g, r) tuple for OpenCV drawing.
+        """
+        return self._color_lut[int(hp_percentage * 100)]
+
+    def _render_label(self, player_name, hp):
+        """
+        Rasterize the outlined "name: hp HP" label once onto a small patch.
+
+        Returns:
+            (patch, mask, (dx, dy)): the BGR patch, a boolean mask of drawn pixels,
+            and the offset of the patch's top-left corner from the text origin.
+        """
+        text = f"{player_name}: {hp} HP"
+        font_scale = 0.6
+        thickness = 2
+        font = cv2.FONT_HERSHEY_SIMPLEX
+
+        (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness + 2)
+        pad = thickness + 2
+        patch = np.zeros((text_h + baseline + 2 * pad, text_w + 2 * pad, 3), np.uint8)
+        alpha = np.zeros(patch.shape[:2], np.uint8)
+        origin = (pad, pad + text_h)
+
+        # Draw outline in black (offset thickness), then main text in white
+        cv2.putText(patch, text, origin, font, font_scale, (0, 0, 0), thickness + 2, cv2.LINE_AA)
+        cv2.putText(alpha, text, origin, font, font_scale, 255, thickness + 2, cv2.LINE_AA)
+        cv2.putText(patch, text, origin, font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+
+        return patch, alpha >= 128, (-pad, -pad - text_h)
+
+    def _render_hud(self, width):
+        """
+        Draw the HP bars for up to two players onto a blank strip the width of the frame.
+
+        Returns:
+            (overlay, mask): the BGR strip and a boolean mask of the pixels drawn on it.
+        """
+        bar_y_offset = 30
+        overlay = np.zeros((bar_y_offset + self.bar_height + 1, width, 3), np.uint8)
+        mask = np.zeros(overlay.shape[:2], bool)
+
+        # Only display bars for the first two players
+        for i, player_name in enumerate(self._slots):
+            if player_name is None:
+                continue
+            hp = int(self._hp[self._name_index[player_name]])
+            hp_percentage = hp / self.max_hp
+
+            # Decide bar position: left for player 0, right for player 1
+            bar_x_offset = 10 if i == 0 else width - self.bar_width - 10
+
+            # Calculate width of the filled portion based on HP percentage
+            current_bar_width = int(hp_percentage * self.bar_width)
+            bar_color = self._get_bar_color(hp_percentage)
+
+            # Paint the HP portion and the dark gray background in one pass over the bar.
+            # The extra row and column match cv2.rectangle's inclusive corners.
+            roi = (slice(bar_y_offset, bar_y_offset + self.bar_height + 1),
+                   slice(bar_x_offset, bar_x_offset + self.bar_width + 1))
+            bar = overlay[roi]
+            bar[:, :current_bar_width + 1] = bar_color
+            bar[:, current_bar_width + 1:] = (50, 50, 50)
+            mask[roi] = True
+
+            # Text label (with outline for a more "animated" look), formatted and
+            # rendered only when this player's HP differs from the cached one
+            cached = self._text_cache.get(player_name)
+            if cached is None or cached[0] != hp:
+                cached = self._text_cache[player_name] = (hp, self._render_label(player_name, hp))
+            patch, label_mask, (dx, dy) = cached[1]
+            text_x = bar_x_offset + dx
+            text_y = bar_y_offset - 5 + dy
+            blit(overlay, patch, label_mask, text_x, text_y)
+            blit(mask, label_mask, label_mask, text_x, text_y)
+
+        return overlay, mask
+
+    def display_hp_bars(self, image):
+        """
+        Draw HP bars for up to two players on the provided image.
+
+        The bars are composited once per HP change; on other frames this is a
+        single masked copy of the cached strip.
+
+        Args:
+            image (numpy.ndarray): The frame (BGR) on which HP bars will be drawn.
+        """
+        key = (image.shape[1], image.shape[0])
+        with self._lock:
+            if self._hud_dirty:
+                self._hud_cache.clear()
+                self._hud_dirty = False
+            hud = self._hud_cache.get(key)
+            if hud is None:
+                hud = self._hud_cache[key] = self._render_hud(image.shape[1])
+
+        overlay, mask = hud
+        blit(image, overlay, mask, 0, 0)
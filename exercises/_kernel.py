@@ -0,0 +1,62 @@
+"""
+exercises/_kernel.py
+
+Per-frame numerics for AttackExercise. Everything here works on plain ints
+and tuples: no attribute lookups, no objects, no allocation beyond the
+returned tuple.
+"""
+
+# Exercise states, kept as small ints so per-frame checks are integer compares.
+WAITING, READY, MOVING = 0, 1, 2
+
+# Arm positions relative to the shoulder line: both wrists below, both above, or mixed.
+DOWN, UP, MID = 0, 1, 2
+
+# _TRANSITIONS[state][arms] -> next state.
+# Arms down always means READY; raising them only advances a READY state.
+_TRANSITIONS = (
+    # DOWN   UP      MID
+    (READY, WAITING, WAITING),  # WAITING
+    (READY, MOVING, READY),     # READY
+    (READY, MOVING, MOVING),    # MOVING
+)
+
+
+def step(left_wrist, right_wrist, left_shoulder, right_shoulder, state, thr_sq):
+    """
+    Advance the attack state machine by one frame.
+
+    Args:
+        left_wrist, right_wrist, left_shoulder, right_shoulder: (x, y) pixel coordinates.
+        state (int): The current state (WAITING, READY or MOVING).
+        thr_sq (int): Squared clap distance threshold in pixels.
+
+    Returns:
+        (new_state, clap): the next state, and True if a clap completed a motion.
+    """
+    # Use the average shoulder y-coordinate as a reference level. Compare doubled
+    # wrist y against the summed shoulder y so everything stays in integers.
+    shoulder_y2 = left_shoulder[1] + right_shoulder[1]
+    left_wrist_y2 = left_wrist[1] << 1
+    right_wrist_y2 = right_wrist[1] << 1
+
+    # Determine if arms are down (ready state) or raised (moving state)
+    # For arms down, both wrists should be below shoulders.
+    if left_wrist_y2 > shoulder_y2 and right_wrist_y2 > shoulder_y2:
+        arms = DOWN
+    # When both wrists are above shoulders, we consider the arms to be raised.
+    elif left_wrist_y2 < shoulder_y2 and right_wrist_y2 < shoulder_y2:
+        arms = UP
+    else:
+        arms = MID
+    state = _TRANSITIONS[state][arms]
+
+    # In moving state, check if a clap occurs.
+    # A clap is detected if the wrists come close enough together.
+    if state == MOVING:
+        dx = left_wrist[0] - right_wrist[0]
+        dy = left_wrist[1] - right_wrist[1]
+        if dx * dx + dy * dy < thr_sq:
+            # After a clap, reset state to ready for the next motion.
+            return READY, True
+    return state, False
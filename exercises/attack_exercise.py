@@ -1,22 +1,77 @@
-import math
+import threading
+
+from ._kernel import WAITING, step
+
+_STATE_NAMES = ("waiting", "ready", "moving")
 
 class AttackExercise:
+    __slots__ = (
+        "motions_required",
+        "hp_per_motion",
+        "current_motion",
+        "total_hp_deducted",
+        "state",
+        "_clap_distance_threshold",
+        "_thr_sq",
+        "_lock",
+    )
+
     def __init__(self, motions_required=5, hp_per_motion=4):
         self.motions_required = motions_required  # Number of motions for a full attack cycle
         self.hp_per_motion = hp_per_motion          # HP deduction per motion
         self.current_motion = 0                     # Count of completed motions
         self.total_hp_deducted = 0                  # Total HP deducted this cycle
-        self.state = "waiting"                      # Possible states: waiting, ready, moving
+        self.state = WAITING                        # Possible states: WAITING, READY, MOVING
         # Threshold for detecting a "clap" (distance between wrists in pixels)
         self.clap_distance_threshold = 50           # You may need to tune this value
         # For initial detection: arms are considered "down" if wrists are below shoulders.
-    
+        # Guards state and counters when frames are processed off the main thread.
+        self._lock = threading.Lock()
+
+    @property
+    def clap_distance_threshold(self):
+        """Maximum distance between wrists (in pixels) that counts as a clap."""
+        return self._clap_distance_threshold
+
+    @clap_distance_threshold.setter
+    def clap_distance_threshold(self, value):
+        self._clap_distance_threshold = value
+        # Squared threshold, so the clap check can skip the sqrt.
+        self._thr_sq = value * value
+
+    @property
+    def state_name(self):
+        """The current state as a string: "waiting", "ready" or "moving"."""
+        return _STATE_NAMES[self.state]
+
     def reset(self):
         """Reset the exercise state for a new attack cycle."""
-        self.current_motion = 0
-        self.total_hp_deducted = 0
-        self.state = "waiting"
-    
+        with self._lock:
+            self.current_motion = 0
+            self.total_hp_deducted = 0
+            self.state = WAITING
+
+    @staticmethod
+    def _landmarks_to_pixels(lm, image_width, image_height):
+        """
+        Convert the wrist and shoulder landmarks to pixel coordinates.
+
+        Plain scalar int() math, with each landmark fetched from the protobuf
+        list once: for four points this beats building and scaling a NumPy array.
+
+        Returns:
+            (left_wrist, right_wrist, left_shoulder, right_shoulder) as (x, y) int tuples.
+        """
+        # MediaPipe landmark indices:
+        # Left Wrist: 15, Right Wrist: 16, Left Shoulder: 11, Right Shoulder: 12.
+        lw, rw, ls, rs = lm[15], lm[16], lm[11], lm[12]
+        return (
+            (int(lw.x * image_width), int(lw.y * image_height)),
+            (int(rw.x * image_width), int(rw.y * image_height)),
+            (int(ls.x * image_width), int(ls.y * image_height)),
+            (int(rs.x * image_width), int(rs.y * image_height)),
+        )
+
     def process_landmarks(self, landmarks, image_width, image_height):
         """
         Process pose landmarks to detect an attack motion.
@@ -25,38 +80,19 @@ class AttackExercise:
         if not landmarks:
             return None
 
-        # MediaPipe landmark indices:
-        # Left Shoulder: 11, Right Shoulder: 12, Left Wrist: 15, Right Wrist: 16.
-        lm = landmarks.landmark
-
-        left_wrist = (int(lm[15].x * image_width), int(lm[15].y * image_height))
-        right_wrist = (int(lm[16].x * image_width), int(lm[16].y * image_height))
-        left_shoulder = (int(lm[11].x * image_width), int(lm[11].y * image_height))
-        right_shoulder = (int(lm[12].x * image_width), int(lm[12].y * image_height))
-
-        # Use the average shoulder y-coordinate as a reference level.
-        shoulder_y = (left_shoulder[1] + right_shoulder[1]) / 2
-
-        # Determine if arms are down (ready state) or raised (moving state)
-        # For arms down, both wrists should be below shoulders.
-        if left_wrist[1] > shoulder_y and right_wrist[1] > shoulder_y:
-            self.state = "ready"
-        # When both wrists are above shoulders, we consider the arms to be raised.
-        elif left_wrist[1] < shoulder_y and right_wrist[1] < shoulder_y:
-            if self.state == "ready":
-                self.state = "moving"
-        
-        # In moving state, check if a clap occurs.
-        # A clap is detected if the wrists come close enough together.
-        if self.state == "moving":
-            distance = math.hypot(left_wrist[0] - right_wrist[0], left_wrist[1] - right_wrist[1])
-            if distance < self.clap_distance_threshold:
-                self.current_motion += 1
-                self.total_hp_deducted += self.hp_per_motion
-                # After a clap, reset state to ready for the next motion.
-                self.state = "ready"
-                return f"Motion {self.current_motion} complete! -{self.hp_per_motion} HP"
-        return None
+        left_wrist, right_wrist, left_shoulder, right_shoulder = self._landmarks_to_pixels(
+            landmarks.landmark, image_width, image_height
+        )
+        with self._lock:
+            self.state, clap = step(
+                left_wrist, right_wrist, left_shoulder, right_shoulder, self.state, self._thr_sq
+            )
+            if not clap:
+                return None
+            self.current_motion += 1
+            self.total_hp_deducted += self.hp_per_motion
+            current_motion = self.current_motion
+        return f"Motion {current_motion} complete! -{self.hp_per_motion} HP"
 
     def is_cycle_complete(self):
         """Return True if the attack cycle is complete (i.e. 5 motions)."""
@@ -1,27 +1,143 @@
+"""
+script/main.py
+
+Single-player arm-level attack exercise on the webcam, with capture and
+display on helper threads.
+
+Run from the repository root with:
+    python -m script.main
+"""
+
 import cv2
 import mediapipe as mp
+import numpy as np
 import tkinter as tk
 from tkinter import messagebox
+import functools
+import logging
 import math
+import queue
+import sys
+import threading
 import time
 
+from app.common import (
+    CaptureThread,
+    PoseRunner,
+    create_pose,
+    open_camera,
+    pin_current_thread,
+    put_latest,
+    start_cv_threads,
+    start_logging,
+)
+from detectors.gamification import blit
+
+logger = logging.getLogger(__name__)
+
+# Pose skeleton as an (N, 2) array of landmark index pairs, and its drawing colors (BGR).
+POSE_CONNECTIONS = np.array(sorted(mp.solutions.pose.POSE_CONNECTIONS), dtype=np.int32)
+LANDMARK_COLOR = (245, 117, 66)
+CONNECTION_COLOR = (245, 66, 230)
+
+# Text drawing settings, bound once instead of looked up on cv2 for every call.
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+MESSAGE_FONT_SCALE = 1.2
+MESSAGE_THICKNESS = 3
+LIVE_FEED_COLOR = (0, 255, 0)
+
+
+@functools.lru_cache(maxsize=64)
+def _text_size(text):
+    """(width, height) of a floating message; the set of message strings is small."""
+    return cv2.getTextSize(text, FONT, MESSAGE_FONT_SCALE, MESSAGE_THICKNESS)[0]
+
+
+def compute_level(hips_y, shoulders_y, overhead_y, wrists_y):
+    """
+    Compute a piecewise level [0..5] such that:
+      - 0 = wrists at hips
+      - 3 = wrists at shoulders
+      - 5 = wrists overhead
+
+    We assume hips_y > shoulders_y > overhead_y in typical image coords.
+    We'll clamp final level to [0..5].
+
+    Plain floats in, an int out, with no object state, so it stays cheap to call
+    every frame and can be compiled as-is if a JIT is ever added.
+    """
+    # If wrists are below shoulders (wrists_y >= shoulders_y):
+    #   ratio_1 = (hips_y - wrists_y) / (hips_y - shoulders_y)
+    #   level in [0..3]
+    # Else if wrists are above shoulders (wrists_y < shoulders_y):
+    #   ratio_2 = (shoulders_y - wrists_y) / (shoulders_y - overhead_y)
+    #   level in [3..5]
+
+    # Safety checks in case of unusual angles or detection:
+    if hips_y <= shoulders_y or shoulders_y <= overhead_y:
+        # Fallback: normal ratio from hips to overhead
+        full_range = hips_y - overhead_y
+        if full_range <= 0:
+            return 0
+        arm_lift = hips_y - wrists_y
+        ratio = arm_lift / full_range
+        ratio = max(0.0, min(ratio, 1.0))
+        return int(ratio * 5)
+
+    if wrists_y >= shoulders_y:
+        # Segment 1: Hips → Shoulders => Levels 0..3
+        segment_1 = hips_y - shoulders_y  # how far from hips to shoulders
+        arm_lift_1 = hips_y - wrists_y    # how far from hips to current wrists
+        if segment_1 <= 0:
+            return 0
+        ratio_1 = arm_lift_1 / segment_1
+        # Map ratio_1 [0..1] => level [0..3]
+        level = ratio_1 * 3
+    else:
+        # Segment 2: Shoulders → Overhead => Levels 3..5
+        segment_2 = shoulders_y - overhead_y
+        arm_lift_2 = shoulders_y - wrists_y
+        if segment_2 <= 0:
+            return 5
+        ratio_2 = arm_lift_2 / segment_2
+        # Map ratio_2 [0..1] => level [3..5]
+        level = 3 + ratio_2 * 2
+
+    # Clamp level to [0..5]
+    level = max(0, min(level, 5))
+    return int(round(level))
+
+
 class AttackExercise:
-    def __init__(self, hp_per_level=4):
+    def __init__(self, hp_per_level=4, antialias_messages=False):
         """
         We fix max_level = 5:
             Level 0 = arms at hips
             Level 3 = arms at shoulders
             Level 5 = arms overhead
+
+        antialias_messages draws floating messages with cv2.LINE_AA. It is off by
+        default because anti-aliased glyph compositing is the slow part of putText.
         """
         self.max_level = 5
         self.hp_per_level = hp_per_level
         self.previous_level = 0
         self.resetting = False
 
-        # We'll store messages here to animate them (fade, fall, etc.)
-        self.active_messages = []
-        self.last_message_time = time.time()
+        # We'll store messages here to animate them (fade, fall, etc.), one entry
+        # per message in each parallel array, oldest first, so a frame's position
+        # and fade updates are single NumPy operations.
+        # At most max_messages are kept; adding another drops the oldest.
+        self.max_messages = 3
+        self.message_fade_duration = 1.0  # seconds
+        self.msg_text = []
+        self.msg_x = np.empty(0)
+        self.msg_y = np.empty(0)
+        self.msg_start = np.empty(0)
+        self.msg_vy = np.empty(0)        # pixels per frame
+        self.last_message_time = time.monotonic()
         self.message_cooldown = 0.5  # Minimum time between messages in seconds
+        self.message_line_type = cv2.LINE_AA if antialias_messages else cv2.LINE_8
 
     def reset(self):
         """Reset the exercise state for a new attack cycle."""
@@ -29,60 +145,16 @@ class AttackExercise:
         self.resetting = False
 
     def _compute_level(self, hips_y, shoulders_y, overhead_y, wrists_y):
-        """
-        Compute a piecewise level [0..5] such that:
-          - 0 = wrists at hips
-          - 3 = wrists at shoulders
-          - 5 = wrists overhead
+        """Compute the arm level [0..5]; see compute_level."""
+        return compute_level(hips_y, shoulders_y, overhead_y, wrists_y)
 
-        We assume hips_y > shoulders_y > overhead_y in typical image coords.
-        We'll clamp final level to [0..5].
-        """
-        # If wrists are below shoulders (wrists_y >= shoulders_y):
-        #   ratio_1 = (hips_y - wrists_y) / (hips_y - shoulders_y)
-        #   level in [0..3]
-        # Else if wrists are above shoulders (wrists_y < shoulders_y):
-        #   ratio_2 = (shoulders_y - wrists_y) / (shoulders_y - overhead_y)
-        #   level in [3..5]
-
-        # Safety checks in case of unusual angles or detection:
-        if hips_y <= shoulders_y or shoulders_y <= overhead_y:
-            # Fallback: normal ratio from hips to overhead
-            full_range = hips_y - overhead_y
-            if full_range <= 0:
-                return 0
-            arm_lift = hips_y - wrists_y
-            ratio = arm_lift / full_range
-            ratio = max(0.0, min(ratio, 1.0))
-            return int(ratio * 5)
-
-        if wrists_y >= shoulders_y:
-            # Segment 1: Hips → Shoulders => Levels 0..3
-            segment_1 = hips_y - shoulders_y  # how far from hips to shoulders
-            arm_lift_1 = hips_y - wrists_y    # how far from hips to current wrists
-            if segment_1 <= 0:
-                return 0
-            ratio_1 = arm_lift_1 / segment_1
-            # Map ratio_1 [0..1] => level [0..3]
-            level = ratio_1 * 3
-        else:
-            # Segment 2: Shoulders → Overhead => Levels 3..5
-            segment_2 = shoulders_y - overhead_y
-            arm_lift_2 = shoulders_y - wrists_y
-            if segment_2 <= 0:
-                return 5
-            ratio_2 = arm_lift_2 / segment_2
-            # Map ratio_2 [0..1] => level [3..5]
-            level = 3 + ratio_2 * 2
-
-        # Clamp level to [0..5]
-        level = max(0, min(level, 5))
-        return int(round(level))
-
-    def process_landmarks(self, landmarks, image_width, image_height):
+    def process_landmarks(self, landmarks, image_width, image_height, frame_time=None):
         """
         Determine the current level of the arms (0..5) using a piecewise approach:
         Hips -> Shoulders -> Overhead.
+
+        frame_time is the timestamp of the current frame; pass the same value to
+        draw_messages so the whole frame uses one clock reading.
         """
         try:
             if not landmarks:
@@ -90,43 +162,39 @@ class AttackExercise:
 
             lm = landmarks.landmark
 
+            # Average y of each left/right pair, in pixels. Plain float math: for a
+            # handful of landmarks this beats building and scaling a NumPy array.
             # Wrists
-            left_wrist = (int(lm[15].x * image_width), int(lm[15].y * image_height))
-            right_wrist = (int(lm[16].x * image_width), int(lm[16].y * image_height))
-            avg_wrist_y = (left_wrist[1] + right_wrist[1]) / 2.0
-
+            avg_wrist_y = (lm[15].y + lm[16].y) * 0.5 * image_height
             # Hips
-            left_hip = (int(lm[23].x * image_width), int(lm[23].y * image_height))
-            right_hip = (int(lm[24].x * image_width), int(lm[24].y * image_height))
-            avg_hip_y = (left_hip[1] + right_hip[1]) / 2.0
-
+            avg_hip_y = (lm[23].y + lm[24].y) * 0.5 * image_height
             # Shoulders
-            left_shoulder = (int(lm[11].x * image_width), int(lm[11].y * image_height))
-            right_shoulder = (int(lm[12].x * image_width), int(lm[12].y * image_height))
-            avg_shoulder_y = (left_shoulder[1] + right_shoulder[1]) / 2.0
+            avg_shoulder_y = (lm[11].y + lm[12].y) * 0.5 * image_height
 
             # Overhead (approx top of head)
             # We'll just use nose (landmark 0) or a bit above it.
             # If you prefer, you can use a different landmark or a small offset.
-            overhead = (int(lm[0].x * image_width), int(lm[0].y * image_height) - 20)
-            overhead_y = overhead[1]
+            nose_lm = lm[0]
+            nose_y = nose_lm.y * image_height
+            overhead_y = nose_y - 20
 
             # For displaying text
-            nose = (int(lm[0].x * image_width), int(lm[0].y * image_height))
+            nose = (int(nose_lm.x * image_width), int(nose_y))
 
             # Compute the new level
             current_level = self._compute_level(avg_hip_y, avg_shoulder_y, overhead_y, avg_wrist_y)
 
             # Throttle message creation to avoid spamming
-            current_time = time.time()
+            current_time = time.monotonic() if frame_time is None else frame_time
             if current_time - self.last_message_time >= self.message_cooldown:
                 # Upward movement
                 if current_level > self.previous_level:
-                    for lvl in range(self.previous_level + 1, current_level + 1):
-                        hp_loss = lvl * self.hp_per_level
-                        self._add_floating_text(f"Level {lvl} => -{hp_loss} HP",
-                                                nose[0], nose[1] - 50)
-                        self.last_message_time = current_time
+                    # One message for the level reached; intermediate levels would
+                    # only be dropped by the message cap.
+                    hp_loss = current_level * self.hp_per_level
+                    self._add_floating_text(f"Level {current_level} => -{hp_loss} HP",
+                                            nose[0], nose[1] - 50, current_time)
+                    self.last_message_time = current_time
 
                 # Downward movement
                 elif current_level < self.previous_level:
@@ -134,21 +202,21 @@ class AttackExercise:
                         # Partial Attack
                         hp_loss = self.previous_level * self.hp_per_level
                         self._add_floating_text(f"Partial Attack! Level {self.previous_level} => -{hp_loss} HP",
-                                                nose[0], nose[1] - 50)
+                                                nose[0], nose[1] - 50, current_time)
                         self.resetting = True
                         self.last_message_time = current_time
 
                 # Full Attack at level 5
                 if current_level == 5 and self.previous_level < 5:
                     hp_loss = 5 * self.hp_per_level
-                    self._add_floating_text(f"Full Attack => -{hp_loss} HP", nose[0], nose[1] - 50)
+                    self._add_floating_text(f"Full Attack => -{hp_loss} HP", nose[0], nose[1] - 50, current_time)
                     self.resetting = True
                     self.last_message_time = current_time
 
             self.previous_level = current_level
             return nose
         except Exception as e:
-            print(f"Error processing landmarks: {e}")
+            logger.warning("Error processing landmarks: %s", e)
             return None
 
     def finalize_if_needed(self):
@@ -156,168 +224,321 @@ class AttackExercise:
         if self.resetting:
             self.reset()
 
-    def _add_floating_text(self, text, x, y):
+    def _add_floating_text(self, text, x, y, start_time, velocity_y=1.0):
         """
         Add a new floating text message that will appear at (x, y) and animate.
         """
-        # Limit the number of active messages to avoid clutter
-        if len(self.active_messages) >= 3:
+        drop = max(0, len(self.msg_text) + 1 - self.max_messages)
+        self.msg_text = self.msg_text[drop:] + [text]
+        self.msg_x = np.append(self.msg_x[drop:], x)
+        self.msg_y = np.append(self.msg_y[drop:], y)
+        self.msg_start = np.append(self.msg_start[drop:], start_time)
+        self.msg_vy = np.append(self.msg_vy[drop:], velocity_y)
+
+    def draw_messages(self, frame, frame_time=None):
+        """
+        Update and draw all active floating messages on the frame.
+        - Each message falls slowly and fades out over message_fade_duration seconds.
+        """
+        if not self.msg_text:
             return
+        current_time = time.monotonic() if frame_time is None else frame_time
+
+        alpha = 1.0 - (current_time - self.msg_start) / self.message_fade_duration
+        keep = alpha > 0.0
+        if not keep.all():
+            # Drop the messages that have fully faded out
+            self.msg_text = [text for text, k in zip(self.msg_text, keep.tolist()) if k]
+            self.msg_x = self.msg_x[keep]
+            self.msg_y = self.msg_y[keep]
+            self.msg_start = self.msg_start[keep]
+            self.msg_vy = self.msg_vy[keep]
+            alpha = alpha[keep]
+
+        # Update positions
+        self.msg_y += self.msg_vy
+
+        # Fade from red (255) to black (0)
+        color_vals = (255 * alpha).astype(np.int64).tolist()
+
+        # Local bindings for the loop below
+        put_text = cv2.putText
+        text_size = _text_size
+        font = FONT
+        font_scale = MESSAGE_FONT_SCALE
+        thickness = MESSAGE_THICKNESS
+        line_type = self.message_line_type
+
+        for text, x, y, color_val in zip(self.msg_text, self.msg_x.tolist(), self.msg_y.tolist(), color_vals):
+            text_w, text_h = text_size(text)
+            text_x = int(x - text_w // 2)
+            text_y = int(y - text_h // 2)
+
+            put_text(
+                frame,
+                text,
+                (text_x, text_y),
+                font,
+                font_scale,
+                (0, 0, color_val),
+                thickness,
+                line_type
+            )
+
+
+def render_live_feed_label():
+    """
+    Rasterize the "Live Feed" label once, positioned as it is drawn at the
+    top-left corner of the frame.
+
+    Returns:
+        (patch, mask): the BGR patch and a boolean mask of its text pixels.
+    """
+    patch = np.zeros((40, 200, 3), dtype=np.uint8)
+    alpha = np.zeros(patch.shape[:2], dtype=np.uint8)
+    cv2.putText(patch, "Live Feed", (10, 30), FONT, 1, LIVE_FEED_COLOR, 2, cv2.LINE_AA)
+    cv2.putText(alpha, "Live Feed", (10, 30), FONT, 1, 255, 2, cv2.LINE_AA)
+    return patch, alpha >= 128
+
+
+def draw_pose(frame, landmarks, connections=POSE_CONNECTIONS, landmark_color=LANDMARK_COLOR,
+              connection_color=CONNECTION_COLOR, min_visibility=0.5):
+    """
+    Draw a pose skeleton with one cv2.polylines call for all connections,
+    instead of one cv2.line per connection.
+
+    Like mp_drawing.draw_landmarks, it skips landmarks that are less visible
+    than min_visibility or lie outside the frame, and draws with cv2.LINE_8.
+
+    Args:
+        frame (numpy.ndarray): BGR image to draw on.
+        landmarks: MediaPipe NormalizedLandmarkList.
+        connections (numpy.ndarray): (N, 2) int array of landmark index pairs.
+        landmark_color, connection_color: BGR colors for joints and bones.
+        min_visibility (float): Landmarks less visible than this are not drawn.
+    """
+    h, w = frame.shape[:2]
+    lm = np.array([(p.x, p.y, p.visibility) for p in landmarks.landmark], dtype=np.float32)
+    xy = lm[:, :2]
+    visible = (lm[:, 2] >= min_visibility) & ((xy >= 0) & (xy <= 1)).all(axis=1)
+    # A landmark at exactly 1.0 maps to the last pixel row/column, as in mp_drawing.
+    pts = np.minimum((xy * (w, h)).astype(np.int32), (w - 1, h - 1))
+
+    edges = connections[visible[connections].all(axis=1)]
+    if len(edges):
+        cv2.polylines(frame, pts[edges], False, connection_color, 2, cv2.LINE_8)
+    for x, y in pts[visible].tolist():
+        cv2.circle(frame, (x, y), 2, landmark_color, 2, cv2.LINE_8)
+
+
+def _get_all(q):
+    """Remove and return every item currently on q, without blocking."""
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
 
-        message_data = {
-            "text": text,
-            "x": x,
-            "y": y,
-            "start_time": time.time(),
-            "fade_duration": 1.0,   # seconds
-            "velocity_y": 1.0       # pixels per frame
-        }
-        self.active_messages.append(message_data)
-
-    def draw_messages(self, frame):
+
+class DisplayThread(threading.Thread):
+    """
+    Show frames from display_q in a window, so cv2.imshow and the GUI event
+    pump in cv2.waitKey stay off the inference loop.
+
+    Key presses are put on key_q. Put None on display_q to close the window
+    and end the thread. The thread also ends if showing a frame fails, so
+    check is_alive() to notice that the window is gone.
+
+    Where the GUI must stay on the main thread (macOS), don't start the thread;
+    call open(), show() and close() from the main thread instead.
+    """
+
+    def __init__(self, window_name, display_q, key_q, core=None):
+        super().__init__(name="display", daemon=True)
+        self.window_name = window_name
+        self.display_q = display_q
+        self.key_q = key_q
+        self.core = core  # CPU core to pin the thread to, if any
+
+    def open(self):
+        """Create the window."""
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+
+    def show(self, frame, wait_ms=1):
         """
-        Update and draw all active floating messages on the frame.
-        - Each message falls slowly and fades out over fade_duration seconds.
+        Draw one frame, pump GUI events for wait_ms milliseconds, and forward
+        any key pressed meanwhile to key_q.
         """
-        current_time = time.time()
-        new_messages = []
-        
-        for msg in self.active_messages:
-            elapsed = current_time - msg["start_time"]
-            alpha = 1.0 - (elapsed / msg["fade_duration"])
-
-            if alpha > 0.0:
-                # Update position
-                msg["y"] += msg["velocity_y"]
-
-                # Fade from red (255) to black (0)
-                color_val = int(255 * alpha)
-                color = (0, 0, color_val)
-
-                font_scale = 1.2
-                thickness = 3
-
-                text_size = cv2.getTextSize(
-                    msg["text"], cv2.FONT_HERSHEY_SIMPLEX,
-                    font_scale, thickness
-                )[0]
-                text_x = int(msg["x"] - text_size[0] // 2)
-                text_y = int(msg["y"] - text_size[1] // 2)
-
-                cv2.putText(
-                    frame,
-                    msg["text"],
-                    (text_x, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    font_scale,
-                    color,
-                    thickness,
-                    cv2.LINE_AA
-                )
-
-                new_messages.append(msg)
-
-        self.active_messages = new_messages
-
-
-def main():
+        cv2.imshow(self.window_name, frame)
+        key = cv2.waitKey(wait_ms) & 0xFF
+        if key != 255:
+            self.key_q.put(key)
+
+    def close(self):
+        """Close the window."""
+        cv2.destroyAllWindows()
+
+    def run(self):
+        try:
+            pin_current_thread(self.core)
+            self.open()
+            while True:
+                frame = self.display_q.get()
+                if frame is None:
+                    break
+                self.show(frame)
+        finally:
+            self.close()
+
+
+def main(cores=None):
+    """
+    Args:
+        cores (tuple): Optional (capture, inference, display) CPU cores to pin
+            the threads to; None for any entry, or for cores, leaves that
+            thread to the scheduler. Off by default: pinning only pays off on
+            an otherwise idle machine with a core to spare per thread.
+    """
+    capture_core, inference_core, display_core = cores or (None, None, None)
+
+    log_listener = start_logging()
+
     # Show a popup before starting camera capture
     root = tk.Tk()
     root.withdraw()
     messagebox.showinfo("Camera Capture", "Starting camera capture. Press 'q' to exit.")
     root.destroy()
 
-    # Initialize MediaPipe Pose
-    mp_pose = mp.solutions.pose
-    mp_drawing = mp.solutions.drawing_utils
-    pose = mp_pose.Pose(
-        model_complexity=1,
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-        smooth_landmarks=True
-    )
+    pose = create_pose()
+    start_cv_threads()
 
     # Create the AttackExercise object
     attack_exercise = AttackExercise(hp_per_level=4)
 
-    # Initialize camera
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        raise Exception("Could not open camera")
-
-    # Set lower resolution for better performance
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-    cv2.namedWindow("Attack Exercise", cv2.WINDOW_NORMAL)
-
-    prev_frame_time = 0
-    target_fps = 30
-    frame_interval = 1.0 / target_fps
-
-    while True:
-        current_time = time.time()
-        elapsed = current_time - prev_frame_time
-        if elapsed < frame_interval:
-            continue
-        prev_frame_time = current_time
-
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame")
-            break
-
-        # Convert to RGB for pose detection
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        rgb_frame.flags.writeable = False
-        results = pose.process(rgb_frame)
-        rgb_frame.flags.writeable = True
-
-        # Convert back to BGR
-        draw_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
-
-        # Draw pose landmarks if detected
-        if results.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                draw_frame,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
-                mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-            )
-
-            # Process multi-level attacks
-            nose_coords = attack_exercise.process_landmarks(
-                results.pose_landmarks, draw_frame.shape[1], draw_frame.shape[0]
-            )
-
-        # Draw any floating text messages
-        attack_exercise.draw_messages(draw_frame)
-
-        # Overlay "Live Feed" text
-        cv2.putText(
-            draw_frame,
-            "Live Feed",
-            (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 255, 0),
-            2,
-            cv2.LINE_AA
-        )
-
-        cv2.imshow("Attack Exercise", draw_frame)
-
-        # Press 'q' to quit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-        # Check if we need to reset after partial or full attack
-        attack_exercise.finalize_if_needed()
-
-    cap.release()
-    cv2.destroyAllWindows()
-    pose.close()
+    cap = open_camera()
+
+    # Capture and display run on their own threads; this loop only does pose and game work.
+    frame_q = queue.Queue(maxsize=1)
+    display_q = queue.Queue(maxsize=1)
+    key_q = queue.Queue()
+    capture_thread = CaptureThread(cap, frame_q, core=capture_core)
+    display_thread = DisplayThread("Attack Exercise", display_q, key_q, core=display_core)
+    # cv2.imshow has to run on the main thread on macOS, so there the loop
+    # below shows each frame itself.
+    display_in_thread = sys.platform != "darwin"
+    capture_thread.start()
+    if display_in_thread:
+        display_thread.start()
+    else:
+        display_thread.open()
+    try:
+        # Pinned after starting the other threads, which would otherwise inherit it.
+        pin_current_thread(inference_core)
+
+        def quit_requested():
+            """True once 'q' was pressed or the display thread has died."""
+            if display_in_thread and not display_thread.is_alive():
+                return True
+            return ord('q') in _get_all(key_q)
+
+        prev_frame_time = 0
+        target_fps = 30
+        frame_interval = 1.0 / target_fps
+
+        # Run pose inference on one frame out of every (pose_frame_skip + 1) and reuse
+        # the last landmarks in between. Arm raises are slow, so 15 Hz is plenty.
+        pose_frame_skip = 1
+        frame_idx = 0
+        pose_landmarks = None
+        pose_runner = PoseRunner(pose)
+
+        # The "Live Feed" label never changes, so it is rasterized once and copied onto each frame.
+        live_feed_label, live_feed_mask = render_live_feed_label()
+
+        while True:
+            # Sleep off the rest of the frame interval instead of spinning on the clock.
+            # After a sleep the frame's time is its scheduled start, so the clock is
+            # read once per frame and oversleeping doesn't push later frames back.
+            current_time = time.monotonic()
+            elapsed = current_time - prev_frame_time
+            if elapsed < frame_interval:
+                time.sleep(frame_interval - elapsed)
+                current_time = prev_frame_time + frame_interval
+            prev_frame_time = current_time
+
+            try:
+                frame = frame_q.get(timeout=0.1)
+            except queue.Empty:
+                # The camera stalled; keep reacting to 'q' and to the window going away
+                if quit_requested():
+                    break
+                continue
+            if frame is None:
+                break
+
+            run_pose = frame_idx % (pose_frame_skip + 1) == 0
+            frame_idx += 1
+
+            # On a duplicate frame the last landmarks are reused instead of running
+            # inference on an identical image.
+            if run_pose:
+                run_pose = not pose_runner.is_duplicate(frame)
+
+            if run_pose:
+                pose_landmarks = pose_runner.process(frame)
+
+            # pose.process only reads the RGB copy, so draw straight onto the BGR frame
+            draw_frame = frame
+
+            # Draw pose landmarks if detected
+            if pose_landmarks:
+                draw_pose(draw_frame, pose_landmarks)
+
+                # Process multi-level attacks, only when the landmarks are new
+                if run_pose:
+                    nose_coords = attack_exercise.process_landmarks(
+                        pose_landmarks, draw_frame.shape[1], draw_frame.shape[0], current_time
+                    )
+
+            # Draw any floating text messages
+            attack_exercise.draw_messages(draw_frame, current_time)
+
+            # Overlay "Live Feed" text
+            # Clipped, so frames smaller than the label still work
+            blit(draw_frame, live_feed_label, live_feed_mask, 0, 0)
+
+            if display_in_thread:
+                put_latest(display_q, draw_frame)
+            else:
+                # On the main thread, waitKey's wait doubles as the frame limiter: it
+                # sleeps out the rest of the frame interval while handling window events.
+                remaining_ms = int((frame_interval - (time.monotonic() - current_time)) * 1000)
+                display_thread.show(draw_frame, max(1, remaining_ms))
+
+            # Press 'q' to quit
+            if quit_requested():
+                break
+
+            # Check if we need to reset after partial or full attack
+            attack_exercise.finalize_if_needed()
+    finally:
+        # Runs on 'q' and on Ctrl+C or an exception alike, so the helper threads,
+        # the camera, the pose graph and the log listener are always shut down.
+        capture_thread.stop()
+        capture_thread.join(1.0)
+        if display_in_thread:
+            put_latest(display_q, None)
+            display_thread.join(1.0)
+        else:
+            display_thread.close()
+        # Releasing the camera while the capture thread is still inside grab() is unsafe
+        if capture_thread.is_alive():
+            logger.warning("Capture thread did not stop; leaving the camera open")
+        else:
+            cap.release()
+        pose.close()
+        log_listener.stop()
 
 
 if __name__ == "__main__":